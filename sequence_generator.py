@@ -0,0 +1,380 @@
+"""
+Streaming yoga sequence generator.
+
+Builds a class arc (centering → warm-up → standing → build → peak →
+cool-down → savasana) on top of the semantic pose search, yielding poses
+phase by phase as soon as each phase is decided. The app can show the
+centering pose while the rest of the class is still being planned.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from demo_search import load_poses_with_embeddings
+from generate_yoga_poses import CATEGORY_CUES
+
+
+# ---------- CLASS ARC ----------
+# (phase name, pose categories, share of the total class time, keep priority)
+# When a class is too short for every phase, lowest keep priority is dropped first.
+PHASES = [
+    ("centering", ["centering"], 0.10, 6),
+    ("warm-up", ["warm-up"], 0.15, 4),
+    ("standing", ["standing", "balance"], 0.25, 3),
+    ("build", ["core", "backbend", "twist"], 0.15, 1),
+    ("peak", ["arm-balance", "inversion", "peak"], 0.10, 2),
+    ("cool-down", ["hip-opener", "cool-down"], 0.15, 5),
+    ("savasana", ["restorative"], 0.10, 7),
+]
+
+LEVEL_MAX_INTENSITY = {
+    "beginner": 4,
+    "intermediate": 5,
+}
+
+# Longest a single hold may be stretched to, as a multiple of base_duration_min
+MAX_HOLD_MULTIPLE = 2
+
+# Phases ranked without the query embedding, so they can stream before it is ready
+UNRANKED_PHASES = {"centering"}
+
+# Query encoding runs here, off the path to the first pose
+_encoder = ThreadPoolExecutor(max_workers=4, thread_name_prefix="encode")
+
+
+def allocate_durations(total_minutes, shares):
+    """
+    Split the class time across phases before any pose is chosen.
+
+    Uses the largest-remainder method so the whole minutes always add up
+    to exactly `total_minutes`, which lets each phase be streamed without
+    revisiting the budget of the phases that follow it.
+
+    Args:
+        total_minutes: Total class length in minutes
+        shares: List of relative weights, one per phase
+
+    Returns:
+        List of whole-minute budgets, one per phase
+    """
+    weight = sum(shares)
+    if total_minutes <= 0 or weight <= 0:
+        return [0] * len(shares)
+
+    exact = [total_minutes * share / weight for share in shares]
+    budgets = [int(x) for x in exact]
+
+    # Hand leftover minutes to the phases that lost the most to rounding
+    leftover = total_minutes - sum(budgets)
+    by_remainder = sorted(
+        range(len(shares)), key=lambda i: exact[i] - budgets[i], reverse=True
+    )
+    for i in by_remainder[:leftover]:
+        budgets[i] += 1
+
+    return budgets
+
+
+def plan_budgets(total_minutes, phase_candidates, shares=None, priorities=None):
+    """
+    Allocate class time to phases so every planned phase can hold a full pose.
+
+    Each phase with candidates first reserves its shortest pose; the rest of
+    the time is split by share. If the class is too short for every phase,
+    phases are dropped in keep-priority order (build and peak first,
+    savasana last) and their minutes go to the others instead of producing
+    stub holds.
+
+    Args:
+        total_minutes: Total class length in minutes
+        phase_candidates: List of candidate pose lists, one per phase
+        shares: Relative phase weights (defaults to the PHASES shares)
+        priorities: Keep priority per phase (defaults to the PHASES priorities)
+
+    Returns:
+        List of whole-minute budgets, one per phase
+    """
+    if shares is None:
+        shares = [share for _, _, share, _ in PHASES]
+    if priorities is None:
+        priorities = [priority for _, _, _, priority in PHASES]
+    if total_minutes <= 0:
+        return [0] * len(shares)
+
+    reserve = [
+        min(pose['base_duration_min'] for pose in candidates) if candidates else 0
+        for candidates in phase_candidates
+    ]
+    kept = [i for i, candidates in enumerate(phase_candidates) if candidates]
+    if not kept:
+        return [0] * len(shares)
+
+    while len(kept) > 1 and sum(reserve[i] for i in kept) > total_minutes:
+        kept.remove(min(kept, key=lambda i: priorities[i]))
+
+    if sum(reserve[i] for i in kept) > total_minutes:
+        # Shorter than any single pose: give it all to the one phase left
+        return [total_minutes if i == kept[0] else 0 for i in range(len(shares))]
+
+    extra = allocate_durations(
+        total_minutes - sum(reserve[i] for i in kept),
+        [share if i in kept else 0 for i, share in enumerate(shares)],
+    )
+    return [reserve[i] + extra[i] if i in kept else 0 for i in range(len(shares))]
+
+
+def _rank_candidates(query_embedding, candidates):
+    """Rank one phase's candidate poses by cosine similarity to the query."""
+    matrix = np.stack([pose['embedding'] for pose in candidates])
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_embedding)
+    scores = matrix @ query_embedding / np.where(norms == 0, 1, norms)
+
+    ranked = sorted(zip(candidates, scores.tolist()), key=lambda x: x[1], reverse=True)
+    return ranked
+
+
+def _order_without_query(candidates):
+    """Intention-independent order: gentlest first, then longest hold."""
+    ordered = sorted(
+        candidates,
+        key=lambda pose: (pose['intensity'], -pose['base_duration_min'], pose['id'])
+    )
+    return [(pose, None) for pose in ordered]
+
+
+def _extend_holds(chosen, remaining, multiple=MAX_HOLD_MULTIPLE):
+    """Spread `remaining` minutes one at a time across holds; returns what's left."""
+    while remaining > 0:
+        extended = False
+        for entry in chosen:
+            cap = None if multiple is None else entry[0]['base_duration_min'] * multiple
+            if remaining > 0 and (cap is None or entry[2] < cap):
+                entry[2] += 1
+                remaining -= 1
+                extended = True
+        if not extended:
+            break
+    return remaining
+
+
+def _shorten_holds(chosen, minutes):
+    """Take `minutes` back from lengthened holds, latest first; returns what's left."""
+    while minutes > 0:
+        shortened = False
+        for entry in reversed(chosen):
+            if minutes > 0 and entry[2] > entry[0]['base_duration_min']:
+                entry[2] -= 1
+                minutes -= 1
+                shortened = True
+        if not shortened:
+            break
+    return minutes
+
+
+def _fill_phase(ranked, budget):
+    """
+    Pick poses for a phase so their durations add up to exactly `budget`.
+
+    Poses are taken once each in rank order at their base duration, skipping
+    any that don't fit. Leftover minutes lengthen the chosen holds up to
+    MAX_HOLD_MULTIPLE times their base duration; only once every hold is at
+    its cap are poses repeated, and never twice in a row. If the minutes left
+    are too few for another pose, lengthened holds give some back to fit one.
+    """
+    chosen = []
+    remaining = budget
+
+    while remaining > 0:
+        added = False
+        for pose, score in ranked:
+            if pose['base_duration_min'] > remaining:
+                continue
+            if chosen and chosen[-1][0] is pose:
+                continue
+            chosen.append([pose, score, pose['base_duration_min']])
+            remaining -= pose['base_duration_min']
+            added = True
+
+        if not chosen:
+            if ranked and remaining > 0:
+                # Only when the whole class is shorter than any single pose
+                pose, score = ranked[0]
+                return [[pose, score, remaining]]
+            break
+
+        remaining = _extend_holds(chosen, remaining)
+        if remaining > 0 and not added:
+            slack = sum(entry[2] - entry[0]['base_duration_min'] for entry in chosen)
+            fits = [
+                (pose, score) for pose, score in ranked
+                if chosen[-1][0] is not pose
+                and pose['base_duration_min'] - remaining <= slack
+            ]
+            if fits:
+                pose, score = fits[0]
+                _shorten_holds(chosen, pose['base_duration_min'] - remaining)
+                chosen.append([pose, score, pose['base_duration_min']])
+                remaining = 0
+            else:
+                # Nothing can be repeated here: stretch past the cap
+                remaining = _extend_holds(chosen, remaining, multiple=None)
+
+    return chosen
+
+
+def stream_sequence(intention, poses, model, total_minutes=45, level="intermediate",
+                    injuries=None, timings=None):
+    """
+    Generate a yoga sequence, yielding each pose as soon as its phase is decided.
+
+    The centering phase is ordered without the query embedding while the
+    intention is encoded in a worker thread, so the first pose doesn't wait
+    on the model. Centering poses therefore have a similarity of None.
+
+    Args:
+        intention: Natural language intention (e.g., "grounding")
+        poses: List of pose dictionaries with embeddings
+        model: SentenceTransformer model
+        total_minutes: Class length in minutes (20 / 45 / 60)
+        level: "beginner" or "intermediate"
+        injuries: List of injuries to avoid (e.g., ["knee injury"])
+        timings: Optional dict that receives 'time_to_first_pose_s',
+            'encode_s' and 'full_plan_s'. Only planner work is counted,
+            not the time the consumer spends between poses.
+
+    Yields:
+        Pose dictionaries with phase, cues, duration and start offset
+    """
+    if level not in LEVEL_MAX_INTENSITY:
+        raise ValueError(f"Unknown level {level!r}, expected one of {list(LEVEL_MAX_INTENSITY)}")
+
+    return _stream_sequence(intention, poses, model, total_minutes,
+                            LEVEL_MAX_INTENSITY[level], set(injuries or []), timings)
+
+
+def _timed_encode(model, intention):
+    start_time = time.perf_counter()
+    embedding = model.encode(intention)
+    return embedding, time.perf_counter() - start_time
+
+
+def _stream_sequence(intention, poses, model, total_minutes, max_intensity, injuries, timings):
+    # Planner time only: the clock is stopped around each yield, and the wait
+    # for the encode is replaced by the encode's own duration.
+    busy = 0.0
+    start_time = time.perf_counter()
+
+    encoding = _encoder.submit(_timed_encode, model, intention)
+    query_embedding = None
+    encode_s = 0.0
+
+    phase_candidates = []
+    for _, categories, _, _ in PHASES:
+        phase_candidates.append([
+            pose for pose in poses
+            if pose['category'] in categories
+            and pose['intensity'] <= max_intensity
+            and not injuries.intersection(pose.get('contraindications', []))
+        ])
+    budgets = plan_budgets(total_minutes, phase_candidates)
+
+    elapsed_min = 0
+    for (phase, _, _, _), candidates, budget in zip(PHASES, phase_candidates, budgets):
+        if not candidates or budget <= 0:
+            continue
+
+        if phase in UNRANKED_PHASES:
+            ranked = _order_without_query(candidates)
+        else:
+            if query_embedding is None:
+                busy += time.perf_counter() - start_time
+                query_embedding, encode_s = encoding.result()
+                busy += encode_s
+                start_time = time.perf_counter()
+            ranked = _rank_candidates(query_embedding, candidates)
+
+        for pose, score, duration in _fill_phase(ranked, budget):
+            pose_out = {
+                "phase": phase,
+                "id": pose['id'],
+                "name": pose['name'],
+                "sanskrit_name": pose['sanskrit_name'],
+                "category": pose['category'],
+                "start_min": elapsed_min,
+                "duration_min": duration,
+                "cues": CATEGORY_CUES.get(pose['category'], pose.get('cues', [])),
+                "similarity": None if score is None else round(score, 3),
+            }
+            elapsed_min += duration
+
+            busy += time.perf_counter() - start_time
+            if timings is not None and 'time_to_first_pose_s' not in timings:
+                timings['time_to_first_pose_s'] = busy
+            yield pose_out
+            start_time = time.perf_counter()
+
+    busy += time.perf_counter() - start_time
+    if query_embedding is None:
+        # Every phase was unranked; still count the encode as planner work
+        _, encode_s = encoding.result()
+        busy += encode_s
+
+    if timings is not None:
+        timings['encode_s'] = encode_s
+        timings['full_plan_s'] = busy
+
+
+async def astream_sequence(intention, poses, model, **kwargs):
+    """
+    Async iterator version of `stream_sequence`.
+
+    Each step runs in a worker thread so encoding and ranking don't block
+    the event loop. Accepts the same keyword arguments as `stream_sequence`.
+    """
+    generator = stream_sequence(intention, poses, model, **kwargs)
+    done = object()
+
+    while True:
+        pose = await asyncio.to_thread(next, generator, done)
+        if pose is done:
+            break
+        yield pose
+
+
+def generate_sequence(intention, poses, model, **kwargs):
+    """Generate the full sequence as a list (non-streaming)."""
+    return list(stream_sequence(intention, poses, model, **kwargs))
+
+
+def main():
+    print("Loading poses with embeddings...")
+    poses = load_poses_with_embeddings()
+    print(f"✓ Loaded {len(poses)} poses")
+
+    print("Loading semantic search model...")
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    print("✓ Model ready\n")
+
+    intention = "grounding and heart-opening"
+    timings = {}
+    total = 0
+
+    print(f"Streaming a 45 minute sequence for '{intention}'...\n")
+    for pose in stream_sequence(intention, poses, model, total_minutes=45, timings=timings):
+        total += pose['duration_min']
+        print(f"[{pose['phase']:>10}] {pose['name']} ({pose['sanskrit_name']}) "
+              f"- {pose['duration_min']} min")
+        print(f"             {pose['cues'][0]}")
+
+    print(f"\n✓ Total time: {total} min")
+    print(f"  Time to first pose: {timings['time_to_first_pose_s'] * 1000:.1f} ms")
+    print(f"  Query encode:       {timings['encode_s'] * 1000:.1f} ms")
+    print(f"  Full plan:          {timings['full_plan_s'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
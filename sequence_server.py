@@ -0,0 +1,145 @@
+"""
+Minimal HTTP endpoint that streams a yoga sequence as chunked JSON lines.
+
+    python sequence_server.py
+    curl -N "http://localhost:8000/sequence?intention=grounding&time=45&injury=knee+injury"
+
+Each pose is sent as soon as its phase is decided; the final line reports
+the total time and the time-to-first-pose / full-plan latencies.
+"""
+
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from sentence_transformers import SentenceTransformer
+
+from demo_search import load_poses_with_embeddings
+from sequence_generator import LEVEL_MAX_INTENSITY, stream_sequence
+
+MIN_CLASS_MINUTES = 1
+MAX_CLASS_MINUTES = 180
+
+
+def _to_ms(seconds):
+    """Seconds to rounded milliseconds; None (null) if never measured."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class SequenceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 is required for Transfer-Encoding: chunked
+    protocol_version = "HTTP/1.1"
+    poses = None
+    model = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/sequence":
+            self.send_error(404)
+            return
+
+        params = parse_qs(url.query)
+        try:
+            total_minutes = int(params.get("time", ["45"])[0])
+        except ValueError:
+            self.send_error(400, "time must be a whole number of minutes")
+            return
+        if not MIN_CLASS_MINUTES <= total_minutes <= MAX_CLASS_MINUTES:
+            self.send_error(
+                400, f"time must be between {MIN_CLASS_MINUTES} and {MAX_CLASS_MINUTES} minutes"
+            )
+            return
+
+        level = params.get("level", ["intermediate"])[0]
+        if level not in LEVEL_MAX_INTENSITY:
+            self.send_error(400, f"level must be one of: {', '.join(LEVEL_MAX_INTENSITY)}")
+            return
+
+        timings = {}
+        sequence = stream_sequence(
+            params.get("intention", [""])[0],
+            self.poses,
+            self.model,
+            total_minutes=total_minutes,
+            level=level,
+            injuries=params.get("injury", []),
+            timings=timings,
+        )
+
+        # Plan the first pose before committing to a 200, so early failures
+        # still get a proper error status
+        try:
+            first = next(sequence, None)
+        except Exception as e:
+            self.send_error(500, f"could not plan sequence: {e}")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            self._stream_poses(first, sequence, timings)
+        except (BrokenPipeError, ConnectionResetError):
+            self.log_message("sequence: client disconnected mid-stream")
+            sequence.close()
+            return
+
+        if "full_plan_s" not in timings or "time_to_first_pose_s" not in timings:
+            return
+        self.log_message(
+            "sequence: first pose %.1f ms, full plan %.1f ms",
+            timings["time_to_first_pose_s"] * 1000,
+            timings["full_plan_s"] * 1000,
+        )
+
+    def _stream_poses(self, first, sequence, timings):
+        total = 0
+        summary = {"done": True}
+        try:
+            pose = first
+            while pose is not None:
+                total += pose["duration_min"]
+                self._write_chunk(json.dumps(pose) + "\n")
+                pose = next(sequence, None)
+        except (BrokenPipeError, ConnectionResetError):
+            raise
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            self.log_error("sequence failed mid-stream: %s", e)
+            summary = {"error": str(e)}
+
+        if "done" in summary:
+            summary.update({
+                "total_min": total,
+                "time_to_first_pose_ms": _to_ms(timings.get("time_to_first_pose_s")),
+                "encode_ms": _to_ms(timings.get("encode_s")),
+                "full_plan_ms": _to_ms(timings.get("full_plan_s")),
+            })
+        self._write_chunk(json.dumps(summary) + "\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main(host="localhost", port=8000):
+    print("Loading poses with embeddings...")
+    SequenceHandler.poses = load_poses_with_embeddings()
+    print(f"✓ Loaded {len(SequenceHandler.poses)} poses")
+
+    print("Loading semantic search model...")
+    SequenceHandler.model = SentenceTransformer('all-MiniLM-L6-v2')
+    print("✓ Model ready")
+
+    server = ThreadingHTTPServer((host, port), SequenceHandler)
+    print(f"\nStreaming sequences on http://{host}:{port}/sequence")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
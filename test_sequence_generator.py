@@ -0,0 +1,227 @@
+"""
+Checks for the streaming sequence generator.
+Uses a stub encoder, so no model download is needed.
+"""
+
+import asyncio
+import http.client
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+from demo_search import load_poses_with_embeddings
+from sequence_generator import (
+    LEVEL_MAX_INTENSITY,
+    MAX_HOLD_MULTIPLE,
+    PHASES,
+    allocate_durations,
+    astream_sequence,
+    generate_sequence,
+    plan_budgets,
+    stream_sequence,
+)
+from sequence_server import SequenceHandler
+
+TOTALS = [0, 1, 20, 45, 60, 90]
+ALL_INJURIES = ["ankle injury", "low back injury", "wrist injury", "neck injury", "knee injury"]
+
+POSES = load_poses_with_embeddings()
+
+
+class StubModel:
+    """Stands in for SentenceTransformer: returns a fixed embedding."""
+
+    def __init__(self, delay_s=0.0):
+        self.delay_s = delay_s
+
+    def encode(self, text):
+        time.sleep(self.delay_s)
+        return np.ones(len(POSES[0]['embedding']))
+
+
+class FailingModel:
+    """Encoder that always fails, to exercise error reporting."""
+
+    def encode(self, text):
+        raise RuntimeError("encoder unavailable")
+
+
+def candidates_for(level, injuries):
+    return [
+        [
+            pose for pose in POSES
+            if pose['category'] in categories
+            and pose['intensity'] <= LEVEL_MAX_INTENSITY[level]
+            and not set(injuries).intersection(pose['contraindications'])
+        ]
+        for _, categories, _, _ in PHASES
+    ]
+
+
+def test_allocate_durations_sums_to_total():
+    shares = [share for _, _, share, _ in PHASES]
+    for total in TOTALS:
+        assert sum(allocate_durations(total, shares)) == total
+
+
+def test_plan_budgets_skips_phases_without_candidates():
+    for level in LEVEL_MAX_INTENSITY:
+        for injuries in ([], ALL_INJURIES):
+            phase_candidates = candidates_for(level, injuries)
+            for total in TOTALS:
+                budgets = plan_budgets(total, phase_candidates)
+                assert sum(budgets) == total
+                for candidates, budget in zip(phase_candidates, budgets):
+                    if not candidates:
+                        assert budget == 0
+                    elif budget and total >= 20:
+                        assert budget >= min(p['base_duration_min'] for p in candidates)
+
+
+def test_sequence_durations_sum_to_total():
+    model = StubModel()
+    for level in LEVEL_MAX_INTENSITY:
+        for injuries in ([], ALL_INJURIES):
+            for total in TOTALS:
+                sequence = generate_sequence(
+                    "grounding", POSES, model,
+                    total_minutes=total, level=level, injuries=injuries
+                )
+                assert sum(pose['duration_min'] for pose in sequence) == total
+                for pose in sequence:
+                    assert not set(injuries).intersection(
+                        next(p for p in POSES if p['id'] == pose['id'])['contraindications']
+                    )
+
+
+def test_holds_stay_within_bounds():
+    model = StubModel()
+    base = {pose['id']: pose['base_duration_min'] for pose in POSES}
+    for level in LEVEL_MAX_INTENSITY:
+        for total in [20, 45, 60, 90, 180]:
+            for pose in generate_sequence("grounding", POSES, model, total_minutes=total, level=level):
+                assert base[pose['id']] <= pose['duration_min'] <= base[pose['id']] * MAX_HOLD_MULTIPLE
+
+
+def test_no_pose_twice_in_a_row():
+    model = StubModel()
+    for level in LEVEL_MAX_INTENSITY:
+        for total in [20, 45, 60, 90, 180]:
+            sequence = generate_sequence("grounding", POSES, model, total_minutes=total, level=level)
+            for previous, pose in zip(sequence, sequence[1:]):
+                assert previous['id'] != pose['id']
+
+
+def test_holds_lengthen_before_poses_repeat():
+    sequence = generate_sequence("grounding", POSES, StubModel(), total_minutes=90)
+    base = {pose['id']: pose['base_duration_min'] for pose in POSES}
+    for phase, _, _, _ in PHASES:
+        holds = [pose for pose in sequence if pose['phase'] == phase]
+        ids = [pose['id'] for pose in holds]
+        if len(ids) != len(set(ids)):
+            assert all(
+                pose['duration_min'] == base[pose['id']] * MAX_HOLD_MULTIPLE
+                for pose in holds[:len(set(ids))]
+            )
+
+
+def test_short_class_keeps_centering_and_savasana():
+    for level in LEVEL_MAX_INTENSITY:
+        for total in [8, 10, 12]:
+            sequence = generate_sequence("grounding", POSES, StubModel(), total_minutes=total, level=level)
+            assert sequence[0]['phase'] == "centering"
+            assert sequence[-1]['phase'] == "savasana"
+
+
+def test_async_stream_matches_generate():
+    async def collect():
+        return [pose async for pose in astream_sequence(
+            "grounding", POSES, StubModel(), total_minutes=45, level="beginner"
+        )]
+
+    expected = generate_sequence("grounding", POSES, StubModel(), total_minutes=45, level="beginner")
+    assert asyncio.run(collect()) == expected
+
+
+def test_unknown_level_is_rejected():
+    try:
+        stream_sequence("grounding", POSES, StubModel(), level="advanced")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError for unknown level")
+
+
+def test_first_pose_does_not_wait_for_encode():
+    timings = {}
+    consumer_s = 0.0
+    for _ in stream_sequence("grounding", POSES, StubModel(delay_s=0.05), timings=timings):
+        time.sleep(0.01)  # consumer time must not count as planner time
+        consumer_s += 0.01
+
+    assert timings['time_to_first_pose_s'] < timings['encode_s'] <= timings['full_plan_s']
+    assert timings['full_plan_s'] < timings['encode_s'] + consumer_s / 2
+
+
+def serve(model):
+    handler = type("StubHandler", (SequenceHandler,), {"poses": POSES, "model": model})
+    server = ThreadingHTTPServer(("localhost", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get(server, path):
+    connection = http.client.HTTPConnection("localhost", server.server_address[1])
+    connection.request("GET", path)
+    response = connection.getresponse()
+    body = response.read().decode("utf-8")
+    connection.close()
+    return response, body
+
+
+def test_http_streams_json_lines():
+    server = serve(StubModel())
+    try:
+        response, body = get(server, "/sequence?intention=grounding&time=20&level=beginner&injury=knee+injury")
+        assert response.status == 200
+        assert response.getheader("Content-Type") == "application/x-ndjson"
+        assert response.getheader("Transfer-Encoding") == "chunked"
+
+        lines = [json.loads(line) for line in body.splitlines()]
+        poses, summary = lines[:-1], lines[-1]
+        assert poses[0]['phase'] == "centering"
+        assert summary['done'] is True
+        assert summary['total_min'] == sum(pose['duration_min'] for pose in poses) == 20
+        assert summary['time_to_first_pose_ms'] is not None
+
+        for path in ["/sequence?level=advanced", "/sequence?time=abc", "/sequence?time=0",
+                     "/sequence?time=-3", "/sequence?time=1000000"]:
+            assert get(server, path)[0].status == 400
+        assert get(server, "/nope")[0].status == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_reports_errors_in_band():
+    server = serve(FailingModel())
+    try:
+        response, body = get(server, "/sequence?time=20")
+        # Centering streams before the encode is needed, so the failure
+        # arrives after the 200 as a final error line
+        assert response.status == 200
+        lines = [json.loads(line) for line in body.splitlines()]
+        assert lines[0]['phase'] == "centering"
+        assert lines[-1] == {"error": "encoder unavailable"}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    for name, check in list(globals().items()):
+        if name.startswith("test_"):
+            check()
+            print(f"✓ {name}")